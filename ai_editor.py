@@ -3,6 +3,7 @@ from dataclasses import dataclass, asdict
 from pathlib import Path
 import difflib
 import json
+import sqlite3
 import time
 from datetime import datetime
 
@@ -135,46 +136,119 @@ class EditResult:
 
 
 class EditCache:
+    LEGACY_IMPORTED_KEY = 'legacy_imported'
+
     def __init__(self, cache_path: str):
         self.cache_path = Path(cache_path)
         self.cache: Dict[int, EditResult] = {}
         self.metadata: dict = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._open()
         self._load()
 
+    def _open(self):
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.cache_path), isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results (block_index INTEGER PRIMARY KEY, json TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+        except sqlite3.Error as e:
+            print(f"[CACHE] Failed to open cache: {e}")
+            self._conn = None
+
     def _load(self):
-        if self.cache_path.exists():
-            try:
-                with open(self.cache_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.metadata = data.get('metadata', {})
-                    results_data = data.get('results', {})
-                    for block_idx_str, result_dict in results_data.items():
-                        block_idx = int(block_idx_str)
-                        self.cache[block_idx] = EditResult.from_dict(result_dict)
-                print(f"[CACHE] Loaded {len(self.cache)} cached results from {self.cache_path.name}")
-            except Exception as e:
-                print(f"[CACHE] Failed to load cache: {e}")
-                self.cache = {}
+        if not self._conn:
+            return
+
+        try:
+            for block_idx, result_json in self._conn.execute("SELECT block_index, json FROM results"):
+                self.cache[block_idx] = EditResult.from_dict(json.loads(result_json))
+            for key, value in self._conn.execute("SELECT key, value FROM meta"):
+                self.metadata[key] = json.loads(value)
+        except (sqlite3.Error, ValueError, TypeError) as e:
+            print(f"[CACHE] Failed to load cache: {e}")
+            self.cache = {}
+            self.metadata = {}
+            return
+
+        try:
+            self._import_legacy_json()
+        except (sqlite3.Error, OSError, ValueError, TypeError) as e:
+            print(f"[CACHE] Failed to import legacy cache: {e}")
+
+        if self.cache:
+            print(f"[CACHE] Loaded {len(self.cache)} cached results from {self.cache_path.name}")
+
+    def _import_legacy_json(self):
+        legacy_path = self.cache_path.with_suffix('.json')
+        if (legacy_path == self.cache_path or not legacy_path.exists()
+                or self.LEGACY_IMPORTED_KEY in self.metadata):
+            return
+
+        # Parse everything first, then write in one transaction: a failed or
+        # interrupted import leaves neither rows nor the marker behind, so the
+        # next run retries it. Existing rows win, so a retry never overwrites
+        # results saved since.
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        results = [EditResult.from_dict(result_dict) for result_dict in data.get('results', {}).values()]
+        metadata = {**data.get('metadata', {}), self.LEGACY_IMPORTED_KEY: True}
+
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO results (block_index, json) VALUES (?, ?)",
+                [(r.block_index, json.dumps(r.to_dict(), ensure_ascii=False)) for r in results]
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False)) for key, value in metadata.items()]
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        for result in results:
+            self.cache.setdefault(result.block_index, result)
+        self.metadata = {**metadata, **self.metadata}
+        print(f"[CACHE] Imported legacy cache: {legacy_path.name}")
 
     def get_result(self, block_index: int) -> Optional[EditResult]:
         return self.cache.get(block_index)
 
     def save_result(self, result: EditResult):
         self.cache[result.block_index] = result
-        self._persist()
+        if not self._conn:
+            return
 
-    def _persist(self):
         try:
-            data = {
-                'metadata': self.metadata,
-                'results': {str(idx): result.to_dict() for idx, result in self.cache.items()}
-            }
-            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.cache_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (block_index, json) VALUES (?, ?)",
+                (result.block_index, json.dumps(result.to_dict(), ensure_ascii=False))
+            )
+        except sqlite3.Error as e:
             print(f"[CACHE] Failed to save cache: {e}")
 
+    def _persist_metadata(self):
+        if not self._conn:
+            return
+
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False)) for key, value in self.metadata.items()]
+            )
+        except sqlite3.Error as e:
+            print(f"[CACHE] Failed to save cache metadata: {e}")
+
     def set_metadata(self, document_path: str, model: str, total_blocks: int):
         self.metadata = {
             'document_path': document_path,
@@ -183,32 +257,43 @@ class EditCache:
             'created_at': datetime.now().isoformat(),
             'last_updated': datetime.now().isoformat()
         }
+        self._persist_metadata()
 
     def update_metadata(self):
         self.metadata['last_updated'] = datetime.now().isoformat()
         self.metadata['cached_blocks'] = len(self.cache)
+        self._persist_metadata()
 
     def clear(self):
-        if self.cache_path.exists():
-            self.cache_path.unlink()
+        if self._conn:
+            # Keep the import marker so a cleared cache is not refilled from
+            # the legacy JSON file on the next run.
+            self._conn.execute("DELETE FROM results")
+            self._conn.execute("DELETE FROM meta WHERE key != ?", (self.LEGACY_IMPORTED_KEY,))
         self.cache = {}
         self.metadata = {}
         print(f"[CACHE] Cache cleared: {self.cache_path.name}")
 
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
 
 class TafsirAIEditor:
-    def __init__(self):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         self.client: Optional[OpenAI] = None
-        self.model = config.OPENAI_MODEL
+        self.api_key = api_key if api_key is not None else config.OPENAI_API_KEY
+        self.model = model or config.OPENAI_MODEL
         self._init_client()
 
     def _init_client(self) -> bool:
-        if not config.OPENAI_API_KEY:
+        if not self.api_key:
             print("[ERROR] OPENAI_API_KEY is not set in .env")
             return False
 
         try:
-            self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+            self.client = OpenAI(api_key=self.api_key)
             return True
         except Exception as e:
             print(f"[ERROR] Failed to initialize OpenAI client: {e}")
@@ -224,12 +309,16 @@ class TafsirAIEditor:
         if not text.strip():
             return text, None
 
+        create_completion = self.client.chat.completions.create
+        model = self.model
+        system_prompt = get_system_prompt()
+
         for attempt in range(1, max_retries + 1):
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
+                response = create_completion(
+                    model=model,
                     messages=[
-                        {"role": "system", "content": get_system_prompt()},
+                        {"role": "system", "content": system_prompt},
                         {"role": "user", "content": text}
                     ],
                     temperature=0.1,
@@ -295,6 +384,7 @@ class VisualDiffWriter:
     def __init__(self, source_path: str):
         self.source_path = Path(source_path)
         self.document = Document(str(source_path))
+        self._paragraphs = self.document.paragraphs
 
     def _compute_word_diff(self, old_text: str, new_text: str) -> List[DiffOperation]:
         old_words = old_text.split()
@@ -327,10 +417,10 @@ class VisualDiffWriter:
         return operations
 
     def apply_ayah_brackets(self, paragraph_index: int, text: str) -> bool:
-        if paragraph_index >= len(self.document.paragraphs):
+        if paragraph_index >= len(self._paragraphs):
             return False
 
-        paragraph = self.document.paragraphs[paragraph_index]
+        paragraph = self._paragraphs[paragraph_index]
         paragraph.clear()
 
         cleaned_text = clean_ayah_text(text)
@@ -356,13 +446,13 @@ class VisualDiffWriter:
         return True
 
     def apply_visual_diff(self, paragraph_index: int, original: str, edited: str) -> bool:
-        if paragraph_index >= len(self.document.paragraphs):
+        if paragraph_index >= len(self._paragraphs):
             return False
 
         if original.strip() == edited.strip():
             return False
 
-        paragraph = self.document.paragraphs[paragraph_index]
+        paragraph = self._paragraphs[paragraph_index]
         paragraph.clear()
 
         diff_ops = self._compute_word_diff(original, edited)
@@ -438,142 +528,147 @@ def edit_document(
         input_file = Path(input_path)
         output_path = str(input_file.parent / f"{input_file.stem}_edited{input_file.suffix}")
 
-    cache_path = f"{input_path}.cache.json"
+    model = config.OPENAI_MODEL
+    cache_path = f"{input_path}.cache.db"
     cache = EditCache(cache_path) if use_cache else None
-
-    if clear_cache and cache:
-        cache.clear()
-
-    print("\n" + "=" * 70)
-    print("AI-POWERED DOCUMENT CORRECTION (Surgical Word-Level Diff)")
-    if use_cache:
-        print("WITH RESUMABLE PROCESSING (Checkpoints)")
-    print("=" * 70)
-    print(f"\n  Input:  {input_path}")
-    print(f"  Output: {output_path}")
-    print(f"  Model:  {config.OPENAI_MODEL}")
-    if use_cache:
-        print(f"  Cache:  {cache_path}")
-    if dry_run:
-        print("  Mode:   DRY RUN (no changes will be saved)")
-    print()
-
-    editor = TafsirAIEditor()
-    if not editor.is_ready():
-        print("[ERROR] AI corrector not ready. Check OPENAI_API_KEY in .env")
-        return 0, 0, []
-
-    processor = TafsirDocumentProcessor()
-    if not processor.load(input_path):
-        return 0, 0, []
-
-    processor.classify_document()
-
-    ai_blocks = processor.get_ai_processable_blocks()
-    ayah_blocks = processor.get_blocks_by_type(BlockType.AYAH)
-
-    if cache and use_cache:
-        cache.set_metadata(input_path, config.OPENAI_MODEL, len(ai_blocks))
-
-    if max_blocks:
-        ai_blocks = ai_blocks[:max_blocks]
-
-    print(f"  Found {len(ai_blocks)} blocks for AI correction")
-    print(f"  Found {len(ayah_blocks)} ayah blocks (will add beautiful brackets)")
-
-    if cache and len(cache.cache) > 0:
-        print(f"  [CACHE] {len(cache.cache)} blocks already cached\n")
-    else:
+    try:
+
+        if clear_cache and cache:
+            cache.clear()
+
+        print("\n" + "=" * 70)
+        print("AI-POWERED DOCUMENT CORRECTION (Surgical Word-Level Diff)")
+        if use_cache:
+            print("WITH RESUMABLE PROCESSING (Checkpoints)")
+        print("=" * 70)
+        print(f"\n  Input:  {input_path}")
+        print(f"  Output: {output_path}")
+        print(f"  Model:  {model}")
+        if use_cache:
+            print(f"  Cache:  {cache_path}")
+        if dry_run:
+            print("  Mode:   DRY RUN (no changes will be saved)")
         print()
 
-    if not ai_blocks and not ayah_blocks:
-        print("[INFO] No blocks to process")
-        return 0, 0, []
+        editor = TafsirAIEditor(model=model)
+        if not editor.is_ready():
+            print("[ERROR] AI corrector not ready. Check OPENAI_API_KEY in .env")
+            return 0, 0, []
 
-    results: List[EditResult] = []
-    total_changed = 0
-    total_skipped = 0
-    total_cached = 0
+        processor = TafsirDocumentProcessor()
+        if not processor.load(input_path):
+            return 0, 0, []
 
-    for i, block in enumerate(ai_blocks):
-        block_type = "COMMENTARY" if block.block_type == BlockType.COMMENTARY else "TRANSLATION"
-        print(f"  [{i+1}/{len(ai_blocks)}] Processing {block_type} block #{block.index}...", end=" ")
+        processor.classify_document()
 
-        cached_result = cache.get_result(block.index) if cache else None
+        ai_blocks = processor.get_ai_processable_blocks()
+        ayah_blocks = processor.get_blocks_by_type(BlockType.AYAH)
 
-        if cached_result:
-            result = cached_result
-            print("CACHED")
-            total_cached += 1
-        else:
-            try:
-                result = editor.edit_block(block, max_retries=3)
+        if cache and use_cache:
+            cache.set_metadata(input_path, model, len(ai_blocks))
 
-                if cache:
-                    cache.save_result(result)
+        if max_blocks:
+            ai_blocks = ai_blocks[:max_blocks]
 
-                if result.error:
-                    print(f"ERROR: {result.error}")
-                    print("[CACHE] Progress saved. You can resume by re-running the command.")
-                    break
-                elif result.skipped_original:
-                    print("ORIGINAL")
-                    total_skipped += 1
-                elif result.was_changed:
-                    print("CHANGED")
-                    total_changed += 1
-                else:
-                    print("no changes")
-
-            except KeyboardInterrupt:
-                print("\n[INTERRUPTED] Saving progress...")
-                if cache:
-                    cache.update_metadata()
-                print("[CACHE] Progress saved. Resume by re-running the command.")
-                return len(results), total_changed, results
-            except Exception as e:
-                print(f"FATAL ERROR: {e}")
-                if cache:
-                    cache.update_metadata()
-                print("[CACHE] Progress saved.")
-                break
-
-        results.append(result)
-
-        if result.was_changed and not result.skipped_original:
-            total_changed += 1
-        elif result.skipped_original:
-            total_skipped += 1
-
-    if cache:
-        cache.update_metadata()
-
-    print(f"\n  Processed: {len(results)}, Changed: {total_changed}, Skipped (ORIGINAL): {total_skipped}")
-    if total_cached > 0:
-        print(f"  [CACHE] Loaded from cache: {total_cached}")
-
-    if not dry_run and (total_changed > 0 or ayah_blocks):
-        print("\n  Applying surgical word-level diff to document...")
-        writer = VisualDiffWriter(input_path)
-        modified = writer.apply_edits(results, ayah_blocks)
-        writer.save(output_path)
-        print(f"\n  [OK] {modified} paragraphs modified with word-level diff")
-        if ayah_blocks:
-            print(f"  [OK] {len(ayah_blocks)} ayahs beautified with ﴿﴾ brackets (Traditional Arabic font)")
-
-    if total_changed > 0:
-        print("\n" + "-" * 70)
-        print("SAMPLE CHANGES:")
-        print("-" * 70)
+        print(f"  Found {len(ai_blocks)} blocks for AI correction")
+        print(f"  Found {len(ayah_blocks)} ayah blocks (will add beautiful brackets)")
 
-        shown = 0
-        for result in results:
-            if result.was_changed and not result.skipped_original and shown < 3:
-                print(f"\n  Block #{result.block_index}:")
-                print(f"  OLD: {result.original_text[:100]}...")
-                print(f"  NEW: {result.edited_text[:100]}...")
-                shown += 1
-
-    print("\n" + "=" * 70)
+        if cache and len(cache.cache) > 0:
+            print(f"  [CACHE] {len(cache.cache)} blocks already cached\n")
+        else:
+            print()
+
+        if not ai_blocks and not ayah_blocks:
+            print("[INFO] No blocks to process")
+            return 0, 0, []
+
+        results: List[EditResult] = []
+        total_changed = 0
+        total_skipped = 0
+        total_cached = 0
+
+        for i, block in enumerate(ai_blocks):
+            block_type = "COMMENTARY" if block.block_type == BlockType.COMMENTARY else "TRANSLATION"
+            print(f"  [{i+1}/{len(ai_blocks)}] Processing {block_type} block #{block.index}...", end=" ")
+
+            cached_result = cache.get_result(block.index) if cache else None
+
+            if cached_result:
+                result = cached_result
+                print("CACHED")
+                total_cached += 1
+            else:
+                try:
+                    result = editor.edit_block(block, max_retries=3)
+
+                    if cache:
+                        cache.save_result(result)
+
+                    if result.error:
+                        print(f"ERROR: {result.error}")
+                        print("[CACHE] Progress saved. You can resume by re-running the command.")
+                        break
+                    elif result.skipped_original:
+                        print("ORIGINAL")
+                        total_skipped += 1
+                    elif result.was_changed:
+                        print("CHANGED")
+                        total_changed += 1
+                    else:
+                        print("no changes")
+
+                except KeyboardInterrupt:
+                    print("\n[INTERRUPTED] Saving progress...")
+                    if cache:
+                        cache.update_metadata()
+                    print("[CACHE] Progress saved. Resume by re-running the command.")
+                    return len(results), total_changed, results
+                except Exception as e:
+                    print(f"FATAL ERROR: {e}")
+                    if cache:
+                        cache.update_metadata()
+                    print("[CACHE] Progress saved.")
+                    break
 
-    return len(results), total_changed, results
+            results.append(result)
+
+            if result.was_changed and not result.skipped_original:
+                total_changed += 1
+            elif result.skipped_original:
+                total_skipped += 1
+
+        if cache:
+            cache.update_metadata()
+
+        print(f"\n  Processed: {len(results)}, Changed: {total_changed}, Skipped (ORIGINAL): {total_skipped}")
+        if total_cached > 0:
+            print(f"  [CACHE] Loaded from cache: {total_cached}")
+
+        if not dry_run and (total_changed > 0 or ayah_blocks):
+            print("\n  Applying surgical word-level diff to document...")
+            writer = VisualDiffWriter(input_path)
+            modified = writer.apply_edits(results, ayah_blocks)
+            writer.save(output_path)
+            print(f"\n  [OK] {modified} paragraphs modified with word-level diff")
+            if ayah_blocks:
+                print(f"  [OK] {len(ayah_blocks)} ayahs beautified with ﴿﴾ brackets (Traditional Arabic font)")
+
+        if total_changed > 0:
+            print("\n" + "-" * 70)
+            print("SAMPLE CHANGES:")
+            print("-" * 70)
+
+            shown = 0
+            for result in results:
+                if result.was_changed and not result.skipped_original and shown < 3:
+                    print(f"\n  Block #{result.block_index}:")
+                    print(f"  OLD: {result.original_text[:100]}...")
+                    print(f"  NEW: {result.edited_text[:100]}...")
+                    shown += 1
+
+        print("\n" + "=" * 70)
+
+        return len(results), total_changed, results
+    finally:
+        if cache:
+            cache.close()
@@ -1,4 +1,6 @@
 import streamlit as st
+import hashlib
+import string
 import tempfile
 from pathlib import Path
 import sys
@@ -16,75 +18,123 @@ st.set_page_config(
 )
 
 
-def render_block_html(block, show_metadata=False):
-    block_type_colors = {
-        BlockType.AYAH: "#8B0000",
-        BlockType.TRANSLATION: "#000000",
-        BlockType.COMMENTARY: "#2F4F4F",
-        BlockType.EXPLANATION: "#1E4D2B",
-        BlockType.HEADER: "#4B0082",
-        BlockType.REFERENCE: "#696969",
-    }
+_BLOCK_TEMPLATE = string.Template("""
+    <div style="
+        margin-bottom: 20px;
+        padding: 15px;
+        padding-left: $padding_left;
+        $border_left
+        background-color: #fafafa;
+        border-radius: 5px;
+    ">
+        $metadata_html
+        <div style="
+            color: $color;
+            font-family: $font_family;
+            font-size: $font_size;
+            font-style: $font_style;
+            line-height: 1.8;
+            text-align: $text_align;
+            direction: $direction;
+        ">
+            $text
+        </div>
+    </div>
+    """)
 
-    color = block_type_colors.get(block.block_type, "#000000")
+_BLOCK_TYPE_COLORS = {
+    BlockType.AYAH: "#8B0000",
+    BlockType.TRANSLATION: "#000000",
+    BlockType.COMMENTARY: "#2F4F4F",
+    BlockType.EXPLANATION: "#1E4D2B",
+    BlockType.HEADER: "#4B0082",
+    BlockType.REFERENCE: "#696969",
+}
+
+_INDENTED_STYLE = {
+    "padding_left": "30px",
+    "border_left": "border-left: 3px solid #cccccc;",
+    "font_style": "italic",
+}
+
+_DEFAULT_STYLE = {
+    "padding_left": "0px",
+    "border_left": "",
+    "font_style": "normal",
+}
+
+_ARABIC_TEXT_STYLE = {
+    "font_family": "Traditional Arabic, Amiri, serif",
+    "font_size": "18px",
+    "text_align": "right",
+    "direction": "rtl",
+}
+
+_CYRILLIC_TEXT_STYLE = {
+    "font_family": "Georgia, serif",
+    "font_size": "16px",
+    "text_align": "left",
+    "direction": "ltr",
+}
 
-    padding_left = "0px"
-    font_style = "normal"
-    border_left = ""
 
+def render_block_html(block, show_metadata=False):
     if block.block_type in (BlockType.COMMENTARY, BlockType.EXPLANATION):
-        padding_left = "30px"
-        border_left = "border-left: 3px solid #cccccc;"
-        font_style = "italic"
+        block_style = _INDENTED_STYLE
+    else:
+        block_style = _DEFAULT_STYLE
 
     if block.block_type == BlockType.AYAH:
         text = f"﴿ {block.text} ﴾"
-        font_family = "Traditional Arabic, Amiri, serif"
-        font_size = "18px"
-        text_align = "right"
-        direction = "rtl"
+        text_style = _ARABIC_TEXT_STYLE
     else:
         text = block.text
-        font_family = "Georgia, serif"
-        font_size = "16px"
-        text_align = "left"
-        direction = "ltr"
+        text_style = _CYRILLIC_TEXT_STYLE
 
     metadata_html = ""
     if show_metadata:
         can_ai = "✅ AI" if block.can_process_with_ai else "🔒 Protected"
         metadata_html = f'<div style="font-size: 11px; color: #888; margin-bottom: 5px;">[Block #{block.index}] {block.block_type.value} | {can_ai}</div>'
 
-    html = f"""
-    <div style="
-        margin-bottom: 20px;
-        padding: 15px;
-        padding-left: {padding_left};
-        {border_left}
-        background-color: #fafafa;
-        border-radius: 5px;
-    ">
-        {metadata_html}
-        <div style="
-            color: {color};
-            font-family: {font_family};
-            font-size: {font_size};
-            font-style: {font_style};
-            line-height: 1.8;
-            text-align: {text_align};
-            direction: {direction};
-        ">
-            {text}
-        </div>
-    </div>
-    """
+    return _BLOCK_TEMPLATE.substitute(
+        block_style,
+        **text_style,
+        color=_BLOCK_TYPE_COLORS.get(block.block_type, "#000000"),
+        metadata_html=metadata_html,
+        text=text,
+    )
+
 
-    return html
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _classify_document(doc_key: str, _tmp_path: str):
+    processor = TafsirDocumentProcessor()
+    if not processor.load(_tmp_path):
+        return None
+    processor.classify_document()
+    return processor
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _document_stats(doc_key: str, _processor):
+    return _processor.get_stats()
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _ai_blocks(doc_key: str, _processor):
+    return _processor.get_ai_processable_blocks()
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _ayah_blocks(doc_key: str, _processor):
+    return _processor.get_blocks_by_type(BlockType.AYAH)
 
 
 def main():
     st.title("📖 Tafsir Editor - AI-Powered Document Correction")
 
+    api_key = config.OPENAI_API_KEY
+    model = config.OPENAI_MODEL
+
     st.sidebar.header("⚙️ Настройки")
 
     show_metadata = st.sidebar.checkbox("Показать метаданные блоков", value=False)
@@ -111,17 +161,18 @@ def main():
     )
 
     if uploaded_file is not None:
+        file_bytes = uploaded_file.getvalue()
+        doc_key = hashlib.sha1(file_bytes).hexdigest()
+
         with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_file:
-            tmp_file.write(uploaded_file.read())
+            tmp_file.write(file_bytes)
             tmp_path = tmp_file.name
 
-        processor = TafsirDocumentProcessor()
-
         with st.spinner("Загрузка и классификация документа..."):
-            if processor.load(tmp_path):
-                processor.classify_document()
+            processor = _classify_document(doc_key, tmp_path)
 
-                stats = processor.get_stats()
+            if processor is not None:
+                stats = _document_stats(doc_key, processor)
 
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
@@ -149,7 +200,7 @@ def main():
                 with tab2:
                     st.subheader("🤖 AI-Powered Correction")
 
-                    if not config.OPENAI_API_KEY:
+                    if not api_key:
                         st.error("⚠️ OPENAI_API_KEY не установлен в .env файле")
                         st.stop()
 
@@ -192,18 +243,18 @@ def main():
 
                         clear_cache = st.session_state.get('clear_cache', False)
 
-                        ai_blocks = processor.get_ai_processable_blocks()
-                        ayah_blocks = processor.get_blocks_by_type(BlockType.AYAH)
+                        ai_blocks = _ai_blocks(doc_key, processor)
+                        ayah_blocks = _ayah_blocks(doc_key, processor)
 
                         if max_blocks > 0:
                             ai_blocks = ai_blocks[:max_blocks]
 
-                        editor = TafsirAIEditor()
+                        editor = TafsirAIEditor(api_key=api_key, model=model)
                         if not editor.is_ready():
                             st.error("AI editor не готов. Проверьте OPENAI_API_KEY")
                             st.stop()
 
-                        cache_path = f"{tmp_path}.cache.json"
+                        cache_path = f"{tmp_path}.cache.db"
                         cache = EditCache(cache_path) if use_cache else None
 
                         if clear_cache and cache:
@@ -211,7 +262,7 @@ def main():
                             st.session_state['clear_cache'] = False
 
                         if cache:
-                            cache.set_metadata(tmp_path, config.OPENAI_MODEL, len(ai_blocks))
+                            cache.set_metadata(tmp_path, model, len(ai_blocks))
 
                         results = []
                         total_changed = 0
@@ -244,6 +295,7 @@ def main():
 
                         if cache:
                             cache.update_metadata()
+                            cache.close()
 
                         progress_bar.progress(1.0)
                         status_text.text("Применение изменений к документу...")
@@ -1,3 +1,4 @@
+import functools
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -15,6 +16,7 @@ class Config:
     DOCUMENTS_PATH: Path = Path(os.getenv("DOCUMENTS_PATH", "./documents"))
 
     @classmethod
+    @functools.lru_cache(maxsize=1)
     def validate(cls) -> bool:
         errors = []
 
@@ -1,6 +1,7 @@
 from .connection import get_supabase_client, test_connection
 from .schema import (
     create_tables,
+    apply_indexes,
     drop_tables,
     check_tables_exist,
     test_db_connection,
@@ -11,6 +12,7 @@ __all__ = [
     "get_supabase_client",
     "test_connection",
     "create_tables",
+    "apply_indexes",
     "drop_tables",
     "check_tables_exist",
     "test_db_connection",
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Callable, Optional
 from supabase import create_client, Client
 from config import config
 
@@ -23,23 +23,23 @@ def get_supabase_client() -> Client:
     return _supabase_client
 
 
-def test_connection() -> bool:
+def test_connection(log: Callable[[str], None] = print) -> bool:
     try:
         client = get_supabase_client()
-        print(f"🔗 Connecting to Supabase: {config.SUPABASE_URL}")
-        response = client.table("formatting_rules").select("*").limit(1).execute()
-        print("✅ Connection successful!")
-        print(f"   Response status: OK")
+        log(f"🔗 Connecting to Supabase: {config.SUPABASE_URL}")
+        client.table("formatting_rules").select("id").limit(0).execute()
+        log("✅ Connection successful!")
+        log(f"   Response status: OK")
         return True
 
     except Exception as e:
         error_msg = str(e)
         if "relation" in error_msg and "does not exist" in error_msg:
-            print("✅ Connection successful!")
-            print("   ⚠️  Tables not created yet (run schema setup)")
+            log("✅ Connection successful!")
+            log("   ⚠️  Tables not created yet (run schema setup)")
             return True
         else:
-            print(f"❌ Connection failed: {e}")
+            log(f"❌ Connection failed: {e}")
             return False
 
 
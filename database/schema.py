@@ -1,9 +1,15 @@
+import io
+from typing import Callable, Optional
 import psycopg2
 from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
 from config import config
 
 
-SCHEMA_SQL = """
+_pool: Optional[ThreadedConnectionPool] = None
+
+
+TABLES_SQL = """
 -- ============================================
 -- TAFSIR EDITOR DATABASE SCHEMA
 -- ============================================
@@ -99,22 +105,34 @@ CREATE TABLE IF NOT EXISTS transliteration_rules (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
+"""
 
+INDEXES_SQL = """
 -- ============================================
 -- INDEXES
 -- ============================================
 
-CREATE INDEX IF NOT EXISTS idx_document_history_document_name
-ON document_history(document_name);
+DROP INDEX IF EXISTS idx_formatting_rules_active_name;
+
+DROP INDEX IF EXISTS idx_document_history_document_name;
+
+CREATE INDEX IF NOT EXISTS idx_document_history_doc_time
+ON document_history(document_name, created_at DESC);
 
 CREATE INDEX IF NOT EXISTS idx_document_history_created_at
 ON document_history(created_at DESC);
 
+CREATE INDEX IF NOT EXISTS idx_document_history_changes_json
+ON document_history USING GIN (changes_json jsonb_path_ops);
+
 CREATE INDEX IF NOT EXISTS idx_transliteration_rules_category
 ON transliteration_rules(category);
 
 CREATE INDEX IF NOT EXISTS idx_transliteration_rules_priority
 ON transliteration_rules(priority DESC);
+
+CREATE INDEX IF NOT EXISTS idx_transliteration_rules_cyrillic_pattern
+ON transliteration_rules(cyrillic_pattern) WHERE is_active;
 """
 
 SEED_SQL = """
@@ -126,10 +144,10 @@ VALUES (
     'Traditional Arabic',
     'Times New Roman'
 ) ON CONFLICT (name) DO NOTHING;
+"""
 
--- Золотой стандарт транслитерации (инструкция заказчика)
-INSERT INTO transliteration_rules (name, category, cyrillic_pattern, arabic_pattern, priority, notes)
-VALUES
+# Золотой стандарт транслитерации (инструкция заказчика)
+SEED_RULES = [
     ('alif', 'vowels', 'а', 'ا', 100, 'Базовая гласная'),
     ('ba', 'consonants', 'б', 'ب', 100, 'Звук б'),
     ('ta', 'consonants', 'т', 'ت', 100, 'Обычная т'),
@@ -158,10 +176,41 @@ VALUES
     ('ha_hard', 'special', 'h', 'ه', 200, 'Латинская h - КРИТИЧНО для имени Аллаh!'),
     ('waw', 'consonants', 'в', 'و', 100, 'Звук в'),
     ('ya', 'consonants', 'й', 'ي', 100, 'Звук й'),
-    ('hamza', 'special', '''', 'ء', 150, 'Апостроф (хамза)')
+    ('hamza', 'special', "'", 'ء', 150, 'Апостроф (хамза)'),
+]
+
+TRANSLITERATION_INSERT_SQL = """
+INSERT INTO transliteration_rules (name, category, cyrillic_pattern, arabic_pattern, priority, notes)
+VALUES %s
+ON CONFLICT DO NOTHING
+"""
+
+TRANSLITERATION_COLUMNS = "name, category, cyrillic_pattern, arabic_pattern, priority, notes"
+
+TRANSLITERATION_COPY_SQL = """
+CREATE TEMP TABLE tmp_transliteration_rules
+    (LIKE transliteration_rules INCLUDING DEFAULTS) ON COMMIT DROP;
+"""
+
+TRANSLITERATION_MERGE_SQL = f"""
+INSERT INTO transliteration_rules ({TRANSLITERATION_COLUMNS})
+SELECT {TRANSLITERATION_COLUMNS} FROM tmp_transliteration_rules
 ON CONFLICT DO NOTHING;
 """
 
+# Setup is idempotent and re-runnable, so it can skip the WAL flush on commit.
+# LOCAL keeps the setting scoped to the create_tables transaction.
+FAST_SETUP_SQL = "SET LOCAL synchronous_commit = off;"
+
+TABLE_NAMES = ['formatting_rules', 'document_history', 'transliteration_rules']
+
+EXISTING_TABLES_SQL = """
+SELECT table_name
+FROM information_schema.tables
+WHERE table_schema = 'public'
+AND table_name = ANY(%s)
+"""
+
 DROP_SQL = """
 DROP TABLE IF EXISTS document_history CASCADE;
 DROP TABLE IF EXISTS transliteration_rules CASCADE;
@@ -169,11 +218,74 @@ DROP TABLE IF EXISTS formatting_rules CASCADE;
 """
 
 
+def _sql_literal(value) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def render_seed_rules_sql() -> str:
+    values = ",\n".join(
+        "    (" + ", ".join(_sql_literal(v) for v in rule) + ")"
+        for rule in SEED_RULES
+    )
+    return TRANSLITERATION_INSERT_SQL.replace("%s", "\n" + values).strip() + ";\n"
+
+
+def _copy_field(value) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_seed_rules(cursor, rules=SEED_RULES):
+    buffer = io.StringIO()
+    for rule in rules:
+        buffer.write("\t".join(_copy_field(value) for value in rule))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    cursor.execute(TRANSLITERATION_COPY_SQL)
+    cursor.copy_expert(
+        f"COPY tmp_transliteration_rules ({TRANSLITERATION_COLUMNS}) FROM STDIN",
+        buffer
+    )
+    cursor.execute(TRANSLITERATION_MERGE_SQL)
+
+
 def get_db_connection():
+    global _pool
+
     if not config.DATABASE_URL:
         raise ValueError("DATABASE_URL is not set in .env file")
 
-    return psycopg2.connect(config.DATABASE_URL)
+    if _pool is None:
+        _pool = ThreadedConnectionPool(1, 10, config.DATABASE_URL)
+
+    return _pool.getconn()
+
+
+def release_connection(conn):
+    if _pool is not None:
+        _pool.putconn(conn)
+    else:
+        conn.close()
+
+
+def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.closeall()
+        _pool = None
+
+
+def _fetch_existing_tables(cursor) -> set:
+    cursor.execute(EXISTING_TABLES_SQL, (TABLE_NAMES,))
+    return {row[0] for row in cursor.fetchall()}
 
 
 def create_tables(seed_data: bool = True) -> bool:
@@ -183,27 +295,27 @@ def create_tables(seed_data: bool = True) -> bool:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        print("Creating tables...")
-        cursor.execute(SCHEMA_SQL)
-        conn.commit()
-        print("   Tables created successfully")
-
-        if seed_data:
-            print("Inserting initial data...")
-            cursor.execute(SEED_SQL)
-            conn.commit()
-            print("   Initial data inserted")
-
-        cursor.execute("""
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema = 'public'
-            AND table_name IN ('formatting_rules', 'document_history', 'transliteration_rules')
-        """)
-        tables = [row[0] for row in cursor.fetchall()]
+        with conn:
+            cursor.execute(FAST_SETUP_SQL)
+
+            print("Creating tables...")
+            cursor.execute(TABLES_SQL)
+            print("   Tables created successfully")
+
+            if seed_data:
+                print("Inserting initial data...")
+                cursor.execute(SEED_SQL)
+                copy_seed_rules(cursor)
+                print("   Initial data inserted")
+
+            print("Creating indexes...")
+            cursor.execute(INDEXES_SQL)
+            print("   Indexes created successfully")
+
+        tables = _fetch_existing_tables(cursor)
 
         print("\nVerifying tables:")
-        for table in ['formatting_rules', 'document_history', 'transliteration_rules']:
+        for table in TABLE_NAMES:
             if table in tables:
                 print(f"   [OK] {table}")
             else:
@@ -223,7 +335,34 @@ def create_tables(seed_data: bool = True) -> bool:
         return False
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
+
+
+def apply_indexes() -> bool:
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        with conn:
+            print("Updating indexes...")
+            cursor.execute(INDEXES_SQL)
+            print("   Indexes up to date")
+
+        cursor.close()
+        return True
+
+    except psycopg2.Error as e:
+        print(f"Database error: {e}")
+        if conn:
+            conn.rollback()
+        return False
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+    finally:
+        if conn:
+            release_connection(conn)
 
 
 def drop_tables() -> bool:
@@ -247,30 +386,18 @@ def drop_tables() -> bool:
         return False
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
 
 
 def check_tables_exist() -> dict:
     conn = None
-    tables_status = {
-        'formatting_rules': False,
-        'document_history': False,
-        'transliteration_rules': False
-    }
+    tables_status = {table: False for table in TABLE_NAMES}
 
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema = 'public'
-            AND table_name IN ('formatting_rules', 'document_history', 'transliteration_rules')
-        """)
-
-        existing = [row[0] for row in cursor.fetchall()]
-        for table in existing:
+        for table in _fetch_existing_tables(cursor):
             tables_status[table] = True
 
         cursor.close()
@@ -279,32 +406,35 @@ def check_tables_exist() -> dict:
         print(f"Error checking tables: {e}")
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
 
     return tables_status
 
 
+_FULL_SCHEMA_SQL = TABLES_SQL + "\n" + SEED_SQL + "\n" + render_seed_rules_sql() + "\n" + INDEXES_SQL
+
+
 def get_schema_sql() -> str:
-    return SCHEMA_SQL + "\n" + SEED_SQL
+    return _FULL_SCHEMA_SQL
 
 
-def test_db_connection() -> bool:
+def test_db_connection(log: Callable[[str], None] = print) -> bool:
     conn = None
     try:
-        print(f"Testing connection to: {config.DATABASE_URL[:50]}...")
+        log(f"Testing connection to: {config.DATABASE_URL[:50]}...")
         conn = get_db_connection()
         cursor = conn.cursor()
 
         cursor.execute("SELECT version();")
         version = cursor.fetchone()[0]
-        print(f"   Connected to: {version[:60]}...")
+        log(f"   Connected to: {version[:60]}...")
 
         cursor.close()
         return True
 
     except Exception as e:
-        print(f"Connection failed: {e}")
+        log(f"Connection failed: {e}")
         return False
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
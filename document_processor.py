@@ -1,15 +1,53 @@
+import functools
 import re
+import sys
+import zipfile
 from enum import Enum
 from pathlib import Path
 from typing import List, Optional, Generator, Tuple
 from dataclasses import dataclass, field
+import numpy as np
+from lxml import etree
 from docx import Document
 from docx.shared import Pt, Inches, RGBColor
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
+from docx.oxml.parser import element_class_lookup, parse_xml
+from docx.oxml.simpletypes import ST_HpsMeasure, ST_OnOff
+from docx.styles import BabelFish
 from config import config
 
 
+SCRIPT_OTHER = 0
+SCRIPT_ARABIC = 1
+SCRIPT_CYRILLIC = 2
+
+
+BMP_SIZE = 0x10000
+
+
+def _build_script_table(ranges_by_script) -> np.ndarray:
+    # One entry per BMP codepoint plus a trailing SCRIPT_OTHER slot that
+    # astral codepoints are clipped onto.
+    table = np.full(BMP_SIZE + 1, SCRIPT_OTHER, dtype=np.uint8)
+    for script, script_ranges in ranges_by_script.items():
+        for low, high in script_ranges:
+            table[low:high + 1] = script
+    return table
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_hex_color(val: str) -> Tuple[int, int, int]:
+    # Documents use a handful of colors, so every block shares these tuples.
+    return int(val[0:2], 16), int(val[2:4], 16), int(val[4:6], 16)
+
+
+SPACE_CODEPOINTS = np.array(
+    [cp for cp in range(0x3001) if chr(cp).isspace()], dtype=np.uint32
+)
+
+
 class BlockType(Enum):
     AYAH = "ayah"
     TRANSLATION = "translation"
@@ -21,17 +59,26 @@ class BlockType(Enum):
     UNKNOWN = "unknown"
 
 
-@dataclass
+AI_BLOCK_TYPES = (BlockType.COMMENTARY, BlockType.TRANSLATION, BlockType.EXPLANATION)
+
+BLOCK_TYPE_CODES = {block_type: code for code, block_type in enumerate(BlockType)}
+AI_BLOCK_CODES = np.array([BLOCK_TYPE_CODES[t] for t in AI_BLOCK_TYPES], dtype=np.uint8)
+
+
+@dataclass(slots=True)
 class FontInfo:
     name: Optional[str] = None
+    name_lower: Optional[str] = None
     size: Optional[float] = None
     bold: bool = False
     italic: bool = False
     color_rgb: Optional[Tuple[int, int, int]] = None
+    is_red: bool = False
     is_arabic_font: bool = False
+    name_contains_arabic: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class TafsirBlock:
     index: int
     block_type: BlockType
@@ -58,7 +105,7 @@ class TafsirBlock:
     _paragraph_ref: object = field(default=None, repr=False)
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentStats:
     total_blocks: int = 0
     ayah_blocks: int = 0
@@ -79,25 +126,70 @@ class DocumentStats:
 
 class TafsirDocumentProcessor:
 
-    ARABIC_RANGE = re.compile(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]')
-    CYRILLIC_RANGE = re.compile(r'[\u0400-\u04FF\u0500-\u052F]')
-
-    ARABIC_FONTS = {
+    ARABIC_CODEPOINT_RANGES = (
+        (0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF),
+        (0xFB50, 0xFDFF), (0xFE70, 0xFEFF),
+    )
+    CYRILLIC_CODEPOINT_RANGES = ((0x0400, 0x04FF), (0x0500, 0x052F))
+    ARABIC_SEARCH = re.compile(
+        '[' + ''.join(f'\\u{low:04x}-\\u{high:04x}' for low, high in ARABIC_CODEPOINT_RANGES) + ']'
+    ).search
+    CYRILLIC_SEARCH = re.compile(
+        '[' + ''.join(f'\\u{low:04x}-\\u{high:04x}' for low, high in CYRILLIC_CODEPOINT_RANGES) + ']'
+    ).search
+    SCRIPT_TABLE = _build_script_table({
+        SCRIPT_ARABIC: ARABIC_CODEPOINT_RANGES,
+        SCRIPT_CYRILLIC: CYRILLIC_CODEPOINT_RANGES,
+    })
+
+    ARABIC_FONTS = frozenset({
         'traditional arabic', 'arabic typesetting', 'sakkal majalla',
         'simplified arabic', 'arabic transparent', 'al-quran',
         'scheherazade', 'amiri', 'lateef', 'noto naskh arabic',
         'times new roman',
-    }
+    })
 
     RED_THRESHOLD = 150
 
+    # Cyrillic text longer than this with no Arabic is classified without
+    # looking at fonts, so run formatting is not read for it.
+    FONT_SKIP_MIN_LENGTH = 500
+
+    # Short paragraphs (basmala, formulaic references) repeat throughout a
+    # tafsir; their detection result is memoized per processor.
+    DETECT_CACHE_MAX_TEXT = 256
+    DETECT_CACHE_SIZE = 4096
+
+    EXPLANATION_PATTERN = re.compile(r'(?:объяснение|толкование|тафсир):', re.IGNORECASE)
+    REFERENCE_PREFIX_PATTERN = re.compile(r'\s*(?:\[\d+\]|\(\d+:\d+\)|\d+\.\s)')
+    REFERENCE_KEYWORDS = ('сура', 'аят', 'хадис')
+
+    TYPE_LABELS = {
+        BlockType.AYAH: "[AYAH]      ",
+        BlockType.TRANSLATION: "[TRANSLATE] ",
+        BlockType.COMMENTARY: "[COMMENTARY]",
+        BlockType.EXPLANATION: "[EXPLAIN]   ",
+        BlockType.HEADER: "[HEADER]    ",
+        BlockType.REFERENCE: "[REFERENCE] ",
+        BlockType.EMPTY: "[EMPTY]     ",
+        BlockType.UNKNOWN: "[???]       ",
+    }
+
+    DOCUMENT_PART = 'word/document.xml'
+    STYLES_PART = 'word/styles.xml'
+    STREAM_BATCH_SIZE = 1024
+
     def __init__(self, file_path: Optional[str] = None):
         self.file_path: Optional[Path] = Path(file_path) if file_path else None
         self.document: Optional[Document] = None
         self.blocks: List[TafsirBlock] = []
+        self._paragraphs: list = []
+        self._streaming: bool = False
+        self._block_arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
         self._stats: Optional[DocumentStats] = None
+        self._detect_cache: dict = {}
 
-    def load(self, file_path: Optional[str] = None) -> bool:
+    def _check_file_path(self, file_path: Optional[str]) -> bool:
         if file_path:
             self.file_path = Path(file_path)
 
@@ -113,52 +205,167 @@ class TafsirDocumentProcessor:
             print(f"[ERROR] Not a .docx file: {self.file_path}")
             return False
 
+        return True
+
+    def load(self, file_path: Optional[str] = None) -> bool:
+        if not self._check_file_path(file_path):
+            return False
+
         try:
             self.document = Document(str(self.file_path))
+            self._paragraphs = self.document.paragraphs
+            self._streaming = False
             self.blocks = []
+            self._block_arrays = None
             self._stats = None
             print(f"[OK] Document loaded: {self.file_path.name}")
-            print(f"     Paragraphs: {len(self.document.paragraphs)}")
+            print(f"     Paragraphs: {len(self._paragraphs)}")
             return True
         except Exception as e:
             print(f"[ERROR] Failed to load document: {e}")
             return False
 
-    def _count_script_chars(self, text: str) -> Tuple[int, int, int]:
-        arabic = len(self.ARABIC_RANGE.findall(text))
-        cyrillic = len(self.CYRILLIC_RANGE.findall(text))
-        other = len(text) - arabic - cyrillic
-        return arabic, cyrillic, other
+    def _scan_texts(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+
+        joined = ''.join(texts)
+
+        if joined.isascii():
+            codepoints = np.frombuffer(joined.encode('ascii'), dtype=np.uint8)
+            scripts = np.zeros(len(codepoints), dtype=np.uint8)
+        else:
+            codepoints = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32)
+            scripts = self.SCRIPT_TABLE[np.minimum(codepoints, BMP_SIZE)]
+
+        is_space = np.isin(codepoints, SPACE_CODEPOINTS)
+        follows_space = np.empty_like(is_space)
+        follows_space[1:] = is_space[:-1]
+        follows_space[starts[lengths > 0]] = True
+        word_starts = follows_space & ~is_space
+
+        arabic_cumsum = np.concatenate(([0], np.cumsum(scripts == SCRIPT_ARABIC)))
+        cyrillic_cumsum = np.concatenate(([0], np.cumsum(scripts == SCRIPT_CYRILLIC)))
+        words_cumsum = np.concatenate(([0], np.cumsum(word_starts)))
+        blank_cumsum = np.concatenate(([0], np.cumsum((codepoints == 0x20) | (codepoints == 0x0A))))
+
+        arabic = arabic_cumsum[ends] - arabic_cumsum[starts]
+        cyrillic = cyrillic_cumsum[ends] - cyrillic_cumsum[starts]
+        words = words_cumsum[ends] - words_cumsum[starts]
+        nonblank = lengths - (blank_cumsum[ends] - blank_cumsum[starts])
+        return arabic, cyrillic, words, nonblank
+
+    def load_streaming(self, file_path: Optional[str] = None) -> bool:
+        if not self._check_file_path(file_path):
+            return False
 
-    def _extract_font_info(self, paragraph) -> FontInfo:
-        info = FontInfo()
+        try:
+            with zipfile.ZipFile(self.file_path) as package:
+                package.getinfo(self.DOCUMENT_PART)
+        except (zipfile.BadZipFile, KeyError) as e:
+            print(f"[ERROR] Failed to open document: {e}")
+            return False
 
-        if not paragraph.runs:
-            return info
+        self.document = None
+        self._paragraphs = []
+        self._streaming = True
+        self.blocks = []
+        self._block_arrays = None
+        self._stats = None
+        print(f"[OK] Document opened for streaming: {self.file_path.name}")
+        return True
 
-        for run in paragraph.runs:
-            if not run.text.strip():
-                continue
+    def _read_paragraph_style_names(self, package: zipfile.ZipFile) -> Tuple[dict, str]:
+        if self.STYLES_PART not in package.namelist():
+            return {}, ""
+
+        return self._paragraph_style_names(parse_xml(package.read(self.STYLES_PART)))
+
+    def _paragraph_style_names(self, styles) -> Tuple[dict, str]:
+        names = {
+            style.styleId: BabelFish.internal2ui(style.name_val) if style.name_val else ""
+            for style in styles.style_lst
+            if style.type == WD_STYLE_TYPE.PARAGRAPH
+        }
+        default_style = styles.default_for(WD_STYLE_TYPE.PARAGRAPH)
+        if default_style is None or not default_style.name_val:
+            return names, ""
+        return names, BabelFish.internal2ui(default_style.name_val)
 
-            if run.font.name:
-                info.name = run.font.name
-                info.is_arabic_font = run.font.name.lower() in self.ARABIC_FONTS
+    def _iter_body_paragraphs(self, package: zipfile.ZipFile) -> Generator:
+        body_tag = qn('w:body')
 
-            if run.font.size:
-                info.size = run.font.size.pt
+        with package.open(self.DOCUMENT_PART) as stream:
+            context = etree.iterparse(
+                stream, events=('end',), tag=qn('w:p'),
+                remove_blank_text=True, resolve_entities=False
+            )
+            context.set_element_class_lookup(element_class_lookup)
 
-            info.bold = run.font.bold or False
-            info.italic = run.font.italic or False
+            for _, p in context:
+                parent = p.getparent()
+                if parent is None or parent.tag != body_tag:
+                    continue
 
-            if run.font.color and run.font.color.rgb:
-                rgb = run.font.color.rgb
-                info.color_rgb = (rgb[0], rgb[1], rgb[2])
+                yield p
+
+                p.clear()
+                while p.getprevious() is not None:
+                    del parent[0]
+
+    def _extract_font_info(self, paragraph) -> FontInfo:
+        return self._font_info_from_element(paragraph._p)
+
+    def _font_info_from_element(self, p) -> FontInfo:
+        info = FontInfo()
+
+        for r in p.iterchildren(qn('w:r')):
+            if not r.text.strip():
+                continue
+
+            rPr = r.find(qn('w:rPr'))
+            if rPr is None:
+                info.bold = False
+                info.italic = False
+                continue
+
+            rFonts = rPr.find(qn('w:rFonts'))
+            name = rFonts.get(qn('w:ascii')) if rFonts is not None else None
+            if name:
+                info.name = sys.intern(name)
+                info.name_lower = name.lower()
+                info.is_arabic_font = info.name_lower in self.ARABIC_FONTS
+                info.name_contains_arabic = 'arabic' in info.name_lower
+
+            sz = rPr.find(qn('w:sz'))
+            if sz is not None:
+                size = ST_HpsMeasure.convert_from_xml(sz.get(qn('w:val')))
+                if size:
+                    info.size = size.pt
+
+            info.bold = self._on_off(rPr.find(qn('w:b')))
+            info.italic = self._on_off(rPr.find(qn('w:i')))
+
+            color = rPr.find(qn('w:color'))
+            if color is not None:
+                val = color.get(qn('w:val'))
+                if val and val != 'auto':
+                    info.color_rgb = _parse_hex_color(val)
+                    info.is_red = self._is_red_color(info.color_rgb)
 
             if info.name:
                 break
 
         return info
 
+    @staticmethod
+    def _on_off(element) -> bool:
+        if element is None:
+            return False
+        val = element.get(qn('w:val'))
+        return val is None or ST_OnOff.convert_from_xml(val)
+
     def _is_red_color(self, rgb: Optional[Tuple[int, int, int]]) -> bool:
         if not rgb:
             return False
@@ -176,14 +383,11 @@ class TafsirDocumentProcessor:
         if style_name and 'heading' in style_name.lower():
             return BlockType.HEADER, f"Style: {style_name}"
 
-        explanation_keywords = ["объяснение:", "толкование:", "тафсир:"]
-        for keyword in explanation_keywords:
-            if text_stripped.lower().startswith(keyword):
-                return BlockType.EXPLANATION, f"Starts with '{keyword}'"
-
-        is_red = self._is_red_color(font_info.color_rgb)
+        explanation = self.EXPLANATION_PATTERN.match(text_stripped)
+        if explanation:
+            return BlockType.EXPLANATION, f"Starts with '{explanation.group(0).lower()}'"
 
-        if arabic_ratio > 0.9 and is_red:
+        if arabic_ratio > 0.9 and font_info.is_red:
             return BlockType.AYAH, "Pure Arabic + red color"
 
         if arabic_ratio > 0.9 and font_info.is_arabic_font:
@@ -192,7 +396,7 @@ class TafsirDocumentProcessor:
         if arabic_ratio > 0.95:
             return BlockType.AYAH, "Pure Arabic text (>95%)"
 
-        if arabic_ratio > 0.8 and font_info.name and 'arabic' in font_info.name.lower():
+        if arabic_ratio > 0.8 and font_info.name_contains_arabic:
             return BlockType.AYAH, f"High Arabic ratio + {font_info.name}"
 
         if not has_arabic and has_cyrillic:
@@ -205,15 +409,10 @@ class TafsirDocumentProcessor:
         if has_cyrillic and has_arabic and arabic_ratio < 0.5:
             return BlockType.COMMENTARY, "Mixed text, Cyrillic-dominant"
 
-        ref_patterns = [
-            r'^\s*\[\d+\]',
-            r'^\s*\(\d+:\d+\)',
-            r'^\s*\d+\.\s',
-            r'сура|аят|хадис',
-        ]
-        for pattern in ref_patterns:
-            if re.search(pattern, text_stripped.lower()):
-                return BlockType.REFERENCE, f"Matches reference pattern"
+        text_lower = text_stripped.lower()
+        if (self.REFERENCE_PREFIX_PATTERN.match(text_stripped)
+                or any(keyword in text_lower for keyword in self.REFERENCE_KEYWORDS)):
+            return BlockType.REFERENCE, f"Matches reference pattern"
 
         if has_arabic and not has_cyrillic:
             return BlockType.AYAH, "Arabic-only (fallback)"
@@ -222,24 +421,55 @@ class TafsirDocumentProcessor:
 
     def classify_paragraph(self, index: int, paragraph) -> TafsirBlock:
         text = paragraph.text
-        arabic_count, cyrillic_count, _ = self._count_script_chars(text)
-        total_chars = len(text.replace(' ', '').replace('\n', ''))
+        if not text.strip():
+            return self._empty_block(index, paragraph, text)
+
+        arabic_counts, cyrillic_counts, word_counts, nonblank_counts = self._scan_texts([text])
+        arabic_count, cyrillic_count = int(arabic_counts[0]), int(cyrillic_counts[0])
+        if self._needs_font_info(text, arabic_count > 0, cyrillic_count > 0):
+            font_info = self._extract_font_info(paragraph)
+        else:
+            font_info = FontInfo()
+        style_name = paragraph.style.name if paragraph.style else ""
+        return self._classify(index, paragraph, text, font_info, style_name,
+                              arabic_count, cyrillic_count, int(word_counts[0]), int(nonblank_counts[0]))
+
+    def _needs_font_info(self, text: str, has_arabic: bool, has_cyrillic: bool) -> bool:
+        return has_arabic or not has_cyrillic or len(text) <= self.FONT_SKIP_MIN_LENGTH
+
+    def _empty_block(self, index: int, paragraph, text: str) -> TafsirBlock:
+        return TafsirBlock(
+            index=index,
+            block_type=BlockType.EMPTY,
+            text=text,
+            char_count=len(text),
+            _paragraph_ref=paragraph
+        )
 
+    def _classify(self, index: int, paragraph, text: str, font_info: FontInfo, style_name: str,
+                  arabic_count: int, cyrillic_count: int, word_count: int, total_chars: int) -> TafsirBlock:
         has_arabic = arabic_count > 0
         has_cyrillic = cyrillic_count > 0
         arabic_ratio = arabic_count / total_chars if total_chars > 0 else 0
 
-        font_info = self._extract_font_info(paragraph)
-
-        style_name = paragraph.style.name if paragraph.style else ""
-
-        block_type, detection_reason = self._detect_block_type(
-            text, font_info, arabic_ratio, has_arabic, has_cyrillic, style_name
-        )
-
-        can_ai = block_type in (BlockType.COMMENTARY, BlockType.TRANSLATION, BlockType.EXPLANATION)
+        if len(text) <= self.DETECT_CACHE_MAX_TEXT:
+            key = (text, style_name, font_info.name, font_info.is_red)
+            detected = self._detect_cache.get(key)
+            if detected is None:
+                detected = self._detect_block_type(
+                    text, font_info, arabic_ratio, has_arabic, has_cyrillic, style_name
+                )
+                if len(self._detect_cache) < self.DETECT_CACHE_SIZE:
+                    self._detect_cache[key] = detected
+            block_type, detection_reason = detected
+        else:
+            block_type, detection_reason = self._detect_block_type(
+                text, font_info, arabic_ratio, has_arabic, has_cyrillic, style_name
+            )
+
+        can_ai = block_type in AI_BLOCK_TYPES
         ai_notes = ""
-        if block_type == BlockType.AYAH:
+        if block_type is BlockType.AYAH:
             ai_notes = "PROTECTED: Quranic text - no AI modification"
         elif can_ai:
             ai_notes = f"Can process: {detection_reason}"
@@ -257,26 +487,132 @@ class TafsirDocumentProcessor:
             is_bold=font_info.bold,
             is_italic=font_info.italic,
             text_color=font_info.color_rgb,
-            is_red_text=self._is_red_color(font_info.color_rgb),
+            is_red_text=font_info.is_red,
             can_process_with_ai=can_ai,
             ai_processing_notes=ai_notes,
-            word_count=len(text.split()) if text else 0,
+            word_count=word_count,
             char_count=len(text),
             _paragraph_ref=paragraph
         )
 
     def classify_document(self) -> List[TafsirBlock]:
+        if self._streaming:
+            return self._classify_stream()
+
         if not self.document:
             raise ValueError("No document loaded. Call load() first.")
 
+        paragraphs = self._paragraphs
+        elements = [para._p for para in paragraphs]
+        texts = [p.text for p in elements]
+        arabic_counts, cyrillic_counts, word_counts, nonblank_counts = self._scan_texts(texts)
+
+        type_codes = np.empty(len(paragraphs), dtype=np.uint8)
+        style_names, default_style_name = self._paragraph_style_names(self.document.styles.element)
+
         self.blocks = []
-        for i, para in enumerate(self.document.paragraphs):
-            block = self.classify_paragraph(i, para)
+        for i, (para, p) in enumerate(zip(paragraphs, elements)):
+            text = texts[i]
+            if not text.strip():
+                block = self._empty_block(i, para, text)
+            else:
+                style_name = style_names.get(p.style, default_style_name) if p.style else default_style_name
+
+                arabic_count, cyrillic_count = int(arabic_counts[i]), int(cyrillic_counts[i])
+                if self._needs_font_info(text, arabic_count > 0, cyrillic_count > 0):
+                    font_info = self._font_info_from_element(p)
+                else:
+                    font_info = FontInfo()
+                block = self._classify(i, para, text, font_info, style_name,
+                                       arabic_count, cyrillic_count, int(word_counts[i]), int(nonblank_counts[i]))
             self.blocks.append(block)
+            type_codes[i] = BLOCK_TYPE_CODES[block.block_type]
+
+        char_counts = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        self._block_arrays = (type_codes, word_counts, char_counts)
+        self._stats = None
+        return self.blocks
+
+    def _classify_stream(self) -> List[TafsirBlock]:
+        self.blocks = []
+        batch_arrays = []
 
+        for blocks, arrays in self._iter_stream_batches():
+            self.blocks.extend(blocks)
+            batch_arrays.append(arrays)
+
+        if batch_arrays:
+            self._block_arrays = tuple(np.concatenate(arrays) for arrays in zip(*batch_arrays))
+        else:
+            self._block_arrays = None
         self._stats = None
         return self.blocks
 
+    def _iter_stream_batches(self) -> Generator:
+        start = 0
+        batch = []
+
+        with zipfile.ZipFile(self.file_path) as package:
+            style_names, default_style_name = self._read_paragraph_style_names(package)
+
+            for p in self._iter_body_paragraphs(package):
+                text = p.text
+                if not text.strip():
+                    batch.append((text, None, ""))
+                else:
+                    if len(text) > self.FONT_SKIP_MIN_LENGTH:
+                        needs_font_info = self._needs_font_info(
+                            text, self.ARABIC_SEARCH(text) is not None, self.CYRILLIC_SEARCH(text) is not None
+                        )
+                    else:
+                        needs_font_info = True
+
+                    style_name = style_names.get(p.style, default_style_name) if p.style else default_style_name
+                    batch.append((
+                        text,
+                        self._font_info_from_element(p) if needs_font_info else FontInfo(),
+                        style_name,
+                    ))
+
+                if len(batch) >= self.STREAM_BATCH_SIZE:
+                    yield self._classify_batch(start, batch)
+                    start += len(batch)
+                    batch = []
+
+        if batch:
+            yield self._classify_batch(start, batch)
+
+    def _classify_batch(self, start: int, batch: List[Tuple[str, Optional[FontInfo], str]]) -> Tuple[List[TafsirBlock], tuple]:
+        texts = [text for text, _, _ in batch]
+        arabic_counts, cyrillic_counts, word_counts, nonblank_counts = self._scan_texts(texts)
+        type_codes = np.empty(len(batch), dtype=np.uint8)
+
+        blocks = []
+        for i, (text, font_info, style_name) in enumerate(batch):
+            if font_info is None:
+                block = self._empty_block(start + i, None, text)
+            else:
+                block = self._classify(
+                    start + i, None, text, font_info, style_name,
+                    int(arabic_counts[i]), int(cyrillic_counts[i]), int(word_counts[i]), int(nonblank_counts[i])
+                )
+            blocks.append(block)
+            type_codes[i] = BLOCK_TYPE_CODES[block.block_type]
+
+        char_counts = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        return blocks, (type_codes, word_counts, char_counts)
+
+    def _get_block_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._block_arrays is not None and len(self._block_arrays[0]) == len(self.blocks):
+            return self._block_arrays
+
+        count = len(self.blocks)
+        return (
+            np.fromiter((BLOCK_TYPE_CODES[b.block_type] for b in self.blocks), dtype=np.uint8, count=count),
+            np.fromiter((b.word_count for b in self.blocks), dtype=np.int64, count=count),
+            np.fromiter((b.char_count for b in self.blocks), dtype=np.int64, count=count),
+        )
+
     def get_stats(self) -> DocumentStats:
         if not self.blocks:
             self.classify_document()
@@ -284,65 +620,66 @@ class TafsirDocumentProcessor:
         if self._stats:
             return self._stats
 
-        stats = DocumentStats()
-
-        for block in self.blocks:
-            stats.total_blocks += 1
-            stats.total_words += block.word_count
-            stats.total_characters += block.char_count
-
-            if block.block_type == BlockType.AYAH:
-                stats.ayah_blocks += 1
-            elif block.block_type == BlockType.TRANSLATION:
-                stats.translation_blocks += 1
-            elif block.block_type == BlockType.COMMENTARY:
-                stats.commentary_blocks += 1
-            elif block.block_type == BlockType.EXPLANATION:
-                stats.explanation_blocks += 1
-            elif block.block_type == BlockType.HEADER:
-                stats.header_blocks += 1
-            elif block.block_type == BlockType.REFERENCE:
-                stats.reference_blocks += 1
-            elif block.block_type == BlockType.EMPTY:
-                stats.empty_blocks += 1
-            else:
-                stats.unknown_blocks += 1
-
-            if block.can_process_with_ai:
-                stats.ai_processable_blocks += 1
-                stats.ai_processable_words += block.word_count
-
-        self._stats = stats
-        return stats
+        self._stats = self._stats_from_arrays(*self._get_block_arrays())
+        return self._stats
+
+    def get_stream_stats(self) -> DocumentStats:
+        if not self._streaming or self.blocks:
+            return self.get_stats()
+
+        # Only the per-block arrays survive each batch; the blocks themselves
+        # are dropped, so memory stays flat on documents that are never listed.
+        batch_arrays = [arrays for _, arrays in self._iter_stream_batches()]
+        if batch_arrays:
+            arrays = tuple(np.concatenate(columns) for columns in zip(*batch_arrays))
+        else:
+            arrays = (np.empty(0, dtype=np.uint8), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        return self._stats_from_arrays(*arrays)
+
+    def _stats_from_arrays(self, type_codes: np.ndarray, word_counts: np.ndarray,
+                           char_counts: np.ndarray) -> DocumentStats:
+        by_type = np.bincount(type_codes, minlength=len(BLOCK_TYPE_CODES))
+        ai_mask = np.isin(type_codes, AI_BLOCK_CODES)
+
+        return DocumentStats(
+            total_blocks=len(type_codes),
+            ayah_blocks=int(by_type[BLOCK_TYPE_CODES[BlockType.AYAH]]),
+            translation_blocks=int(by_type[BLOCK_TYPE_CODES[BlockType.TRANSLATION]]),
+            commentary_blocks=int(by_type[BLOCK_TYPE_CODES[BlockType.COMMENTARY]]),
+            explanation_blocks=int(by_type[BLOCK_TYPE_CODES[BlockType.EXPLANATION]]),
+            header_blocks=int(by_type[BLOCK_TYPE_CODES[BlockType.HEADER]]),
+            reference_blocks=int(by_type[BLOCK_TYPE_CODES[BlockType.REFERENCE]]),
+            empty_blocks=int(by_type[BLOCK_TYPE_CODES[BlockType.EMPTY]]),
+            unknown_blocks=int(by_type[BLOCK_TYPE_CODES[BlockType.UNKNOWN]]),
+            total_words=int(word_counts.sum()),
+            total_characters=int(char_counts.sum()),
+            ai_processable_blocks=int(ai_mask.sum()),
+            ai_processable_words=int(word_counts[ai_mask].sum()),
+        )
 
     def get_blocks_by_type(self, block_type: BlockType) -> List[TafsirBlock]:
         if not self.blocks:
             self.classify_document()
-        return [b for b in self.blocks if b.block_type == block_type]
+        type_codes, _, _ = self._get_block_arrays()
+        blocks = self.blocks
+        return [blocks[i] for i in np.flatnonzero(type_codes == BLOCK_TYPE_CODES[block_type])]
 
     def get_ai_processable_blocks(self) -> List[TafsirBlock]:
         if not self.blocks:
             self.classify_document()
-        return [b for b in self.blocks if b.can_process_with_ai]
+        type_codes, _, _ = self._get_block_arrays()
+        blocks = self.blocks
+        return [blocks[i] for i in np.flatnonzero(np.isin(type_codes, AI_BLOCK_CODES))]
 
     def print_classification(self, limit: Optional[int] = None, show_empty: bool = False):
         if not self.blocks:
             self.classify_document()
 
-        print(f"\n{'='*70}")
-        print(f"DOCUMENT CLASSIFICATION: {self.file_path.name}")
-        print(f"{'='*70}\n")
-
-        type_icons = {
-            BlockType.AYAH: "[AYAH]      ",
-            BlockType.TRANSLATION: "[TRANSLATE] ",
-            BlockType.COMMENTARY: "[COMMENTARY]",
-            BlockType.EXPLANATION: "[EXPLAIN]   ",
-            BlockType.HEADER: "[HEADER]    ",
-            BlockType.REFERENCE: "[REFERENCE] ",
-            BlockType.EMPTY: "[EMPTY]     ",
-            BlockType.UNKNOWN: "[???]       ",
-        }
+        out = [
+            f"\n{'='*70}\n",
+            f"DOCUMENT CLASSIFICATION: {self.file_path.name}\n",
+            f"{'='*70}\n\n",
+        ]
 
         count = 0
         for block in self.blocks:
@@ -350,28 +687,30 @@ class TafsirDocumentProcessor:
                 continue
 
             if limit and count >= limit:
-                print(f"\n... (showing {limit} of {len(self.blocks)} blocks)")
+                out.append(f"\n... (showing {limit} of {len(self.blocks)} blocks)\n")
                 break
 
-            icon = type_icons.get(block.block_type, "[???]")
+            icon = self.TYPE_LABELS.get(block.block_type, "[???]")
             ai_marker = " [AI-OK]" if block.can_process_with_ai else ""
 
             display_text = block.text[:80].replace('\n', ' ')
             if len(block.text) > 80:
                 display_text += "..."
 
-            print(f"[{block.index:4d}] {icon}{ai_marker}")
-            print(f"       Arabic: {block.arabic_ratio:5.1%} | Font: {block.primary_font or 'default'}")
-            print(f"       {display_text}")
-            print()
+            out.append(
+                f"[{block.index:4d}] {icon}{ai_marker}\n"
+                f"       Arabic: {block.arabic_ratio:5.1%} | Font: {block.primary_font or 'default'}\n"
+                f"       {display_text}\n\n"
+            )
 
             count += 1
 
         stats = self.get_stats()
-        print(f"\n{'='*70}")
-        print("CLASSIFICATION SUMMARY")
-        print(f"{'='*70}")
-        print(f"""
+        out.append(f"""
+{'='*70}
+CLASSIFICATION SUMMARY
+{'='*70}
+
   Total blocks:     {stats.total_blocks}
 
   By Type:
@@ -387,11 +726,20 @@ class TafsirDocumentProcessor:
   AI Processing:
     Blocks for AI:    {stats.ai_processable_blocks}
     Words for AI:     {stats.ai_processable_words}
+
+{'='*70}
+
 """)
-        print(f"{'='*70}\n")
 
+        sys.stdout.write(''.join(out))
+
+
+def create_sample_document(output_path: str = "documents/sample_tafsir.docx", overwrite: bool = True):
+    output = Path(output_path)
+    if not overwrite and output.is_file() and output.stat().st_size > 0:
+        print(f"[OK] Using existing sample document: {output}")
+        return str(output)
 
-def create_sample_document(output_path: str = "documents/sample_tafsir.docx"):
     doc = Document()
 
     title = doc.add_heading('Тафсир Суры Аль-Фатиха', 0)
@@ -440,7 +788,6 @@ def create_sample_document(output_path: str = "documents/sample_tafsir.docx"):
         'а Ар-Рахим — на особую милость к верующим в День Суда.'
     )
 
-    output = Path(output_path)
     output.parent.mkdir(parents=True, exist_ok=True)
     doc.save(str(output))
 
@@ -449,8 +796,6 @@ def create_sample_document(output_path: str = "documents/sample_tafsir.docx"):
 
 
 if __name__ == "__main__":
-    import sys
-
     print("=" * 50)
     print("TAFSIR DOCUMENT PROCESSOR")
     print("Smart Parser with Block Classification")
@@ -464,7 +809,7 @@ if __name__ == "__main__":
 
     processor = TafsirDocumentProcessor()
 
-    if processor.load(file_path):
+    if processor.load_streaming(file_path):
         processor.classify_document()
         processor.print_classification(limit=30)
 
@@ -1,52 +1,167 @@
 #!/usr/bin/env python3
 
+import os
 import sys
+import glob
 import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
 from pathlib import Path
+from typing import List
 
 from config import config
-from database import (
-    get_supabase_client,
-    test_connection,
-    create_tables,
-    drop_tables,
-    check_tables_exist,
-    test_db_connection,
-)
-from document_processor import (
-    TafsirDocumentProcessor,
-    create_sample_document,
-    BlockType,
-)
 
 
-def print_banner():
-    banner = """
+HISTORY_BATCH_SIZE = 64
+
+# Every batched row carries the same columns, so a mixed batch never
+# falls back to NULL for a column one of its rows left out.
+_HISTORY_TEMPLATE = {
+    "document_name": None,
+    "document_path": None,
+    "action": None,
+    "description": None,
+    "changes_json": None,
+    "paragraphs_affected": 0,
+    "characters_changed": 0,
+}
+
+_pending_history: List[dict] = []
+
+
+def history_record(file_path: str, action: str, **fields) -> dict:
+    record = _HISTORY_TEMPLATE.copy()
+    record["document_name"] = Path(file_path).name
+    record["document_path"] = str(file_path)
+    record["action"] = action
+    record.update(fields)
+    return record
+
+
+def log_history(record: dict):
+    _pending_history.append(record)
+    if len(_pending_history) >= HISTORY_BATCH_SIZE:
+        flush_history()
+
+
+def flush_history() -> bool:
+    if not _pending_history:
+        return True
+
+    records = list(_pending_history)
+    _pending_history.clear()
+
+    if not config.SUPABASE_URL or not config.SUPABASE_SERVICE_ROLE_KEY:
+        print("[WARN] Could not log to database: SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in .env")
+        return False
+
+    from httpx import HTTPError
+    from postgrest.exceptions import APIError
+    from supabase import SupabaseException
+    from database import get_supabase_client
+
+    try:
+        client = get_supabase_client()
+        client.table("document_history").insert(records).execute()
+        print(f"[OK] {len(records)} history record(s) logged to database")
+        return True
+    except (APIError, HTTPError, SupabaseException) as e:
+        print(f"[WARN] Could not log to database: {e}")
+        return False
+
+
+def get_classified_processor(file_path: str):
+    from document_processor import TafsirDocumentProcessor
+
+    processor = TafsirDocumentProcessor()
+    if not processor.load_streaming(file_path):
+        return None
+
+    print("\nClassifying blocks...")
+    processor.classify_document()
+    return processor
+
+
+BANNER = """
 ======================================================
      TAFSIR EDITOR
      --------------
      Smart Document Parser for Quran Tafsir
      Block Classification + AI-Powered Editing
 ======================================================
+
 """
-    print(banner)
 
+SETUP_COMPLETE_TEXT = """
+Your Tafsir Editor is ready!
 
-def test_all_connections() -> bool:
-    print("\n" + "="*50)
-    print("DATABASE CONNECTION TEST")
-    print("="*50 + "\n")
+Block Types:
+  [AYAH]       - Quranic verses (PROTECTED from AI)
+  [TRANSLATE]  - Russian translations (can process with AI)
+  [COMMENTARY] - Tafsir text (can process with AI)
+
+Commands:
+  python main.py --classify FILE       # Check block classification
+  python main.py --edit FILE           # AI edit with visual diff
+  python main.py --edit FILE --dry-run # Preview changes only
+  python main.py --process FILE        # Log to database
+
+AI Editing:
+  1. Add OPENAI_API_KEY to .env
+  2. Run: python main.py --edit documents/your_file.docx
+  3. Open the _edited.docx file to review changes
+  4. Changes shown as: [strikethrough old] -> [highlighted new]
+
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def _header_text(title: str, width: int, blank_line: bool) -> str:
+    rule = "=" * width
+    return f"\n{rule}\n{title}\n{rule}\n" + ("\n" if blank_line else "")
+
+
+def print_header(title: str, width: int = 50, blank_line: bool = True):
+    sys.stdout.write(_header_text(title, width, blank_line))
+
+
+def print_banner():
+    sys.stdout.write(BANNER)
+
+
+def test_all_connections(fail_fast: bool = False) -> bool:
+    print_header("DATABASE CONNECTION TEST")
 
     if not config.validate():
         print("\nPlease configure your .env file first!")
         print("Copy .env.example to .env and fill in your credentials.")
         return False
 
-    print("\n[1/2] Testing PostgreSQL connection (for DDL)...")
-    pg_ok = test_db_connection()
+    from database import test_connection, test_db_connection
+
+    if fail_fast:
+        print("\n[1/2] Testing PostgreSQL connection (for DDL)...")
+        pg_ok = test_db_connection()
+
+        print("\n[2/2] Testing Supabase API connection...")
+        api_ok = pg_ok and test_connection()
+        if not pg_ok:
+            print("   Skipped (PostgreSQL connection failed)")
+    else:
+        # Both probes run at once; each collects its own lines so the report
+        # below stays grouped by backend instead of interleaving.
+        pg_log, api_log = [], []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pg_future = executor.submit(test_db_connection, pg_log.append)
+            api_future = executor.submit(test_connection, api_log.append)
+            pg_ok, api_ok = pg_future.result(), api_future.result()
 
-    print("\n[2/2] Testing Supabase API connection...")
-    api_ok = test_connection()
+        print("\n[1/2] Testing PostgreSQL connection (for DDL)...")
+        print("\n".join(pg_log))
+
+        print("\n[2/2] Testing Supabase API connection...")
+        print("\n".join(api_log))
 
     print("\n" + "-"*50)
     if pg_ok and api_ok:
@@ -58,9 +173,12 @@ def test_all_connections() -> bool:
 
 
 def setup_database() -> bool:
-    print("\n" + "="*50)
-    print("DATABASE SETUP (AUTO)")
-    print("="*50 + "\n")
+    if not config.validate():
+        return False
+
+    from database import apply_indexes, check_tables_exist, create_tables
+
+    print_header("DATABASE SETUP (AUTO)")
 
     print("Checking existing tables...")
     tables = check_tables_exist()
@@ -70,16 +188,21 @@ def setup_database() -> bool:
         print("All tables already exist:")
         for table, exists in tables.items():
             print(f"   [OK] {table}")
-        return True
+        # INDEXES_SQL is idempotent; re-running it brings existing databases
+        # up to date with index changes made after they were first set up.
+        return apply_indexes()
 
     print("\nCreating tables automatically...")
     return create_tables(seed_data=True)
 
 
-def drop_database():
-    print("\n" + "="*50)
-    print("DROP DATABASE TABLES")
-    print("="*50 + "\n")
+def drop_database(assume_yes: bool = False):
+    if not config.validate():
+        return False
+
+    from database import drop_tables
+
+    print_header("DROP DATABASE TABLES")
 
     print("WARNING: This will delete ALL data in the following tables:")
     print("   - formatting_rules")
@@ -87,6 +210,9 @@ def drop_database():
     print("   - transliteration_rules")
     print()
 
+    if assume_yes:
+        return drop_tables()
+
     confirm = input("Type 'YES' to confirm: ")
     if confirm == "YES":
         return drop_tables()
@@ -95,33 +221,26 @@ def drop_database():
         return False
 
 
-def classify_document(file_path: str):
-    print("\n" + "="*70)
-    print("SMART DOCUMENT CLASSIFICATION")
-    print("="*70 + "\n")
+def classify_document(file_path: str, quiet: bool = False):
+    print_header("SMART DOCUMENT CLASSIFICATION", width=70)
 
-    processor = TafsirDocumentProcessor()
-
-    if not processor.load(file_path):
+    processor = get_classified_processor(file_path)
+    if processor is None:
         return False
 
-    print("\nClassifying blocks...")
-    processor.classify_document()
-    processor.print_classification(limit=50)
+    if not quiet:
+        processor.print_classification(limit=50)
 
-    ai_blocks = processor.get_ai_processable_blocks()
-    ayah_blocks = processor.get_blocks_by_type(BlockType.AYAH)
+    stats = processor.get_stats()
 
-    print("\n" + "="*70)
-    print("AI PROCESSING SUMMARY")
-    print("="*70)
+    print_header("AI PROCESSING SUMMARY", width=70, blank_line=False)
     print(f"""
   PROTECTED (will NOT be modified by AI):
-    - {len(ayah_blocks)} Quranic verses (AYAH blocks)
+    - {stats.ayah_blocks} Quranic verses (AYAH blocks)
 
   READY FOR AI PROCESSING:
-    - {len(ai_blocks)} blocks (TRANSLATION + COMMENTARY)
-    - {sum(b.word_count for b in ai_blocks)} words total
+    - {stats.ai_processable_blocks} blocks (TRANSLATION + COMMENTARY)
+    - {stats.ai_processable_words} words total
 
   To edit with AI: python main.py --edit {file_path}
 """)
@@ -163,92 +282,104 @@ def edit_document_with_ai(file_path: str, dry_run: bool = False, max_blocks: int
 """)
 
     if not dry_run and changed > 0:
-        try:
-            client = get_supabase_client()
-            client.table("document_history").insert({
-                "document_name": input_file.name,
-                "document_path": str(file_path),
-                "action": "ai_edited",
-                "description": f"AI editing: {changed} blocks modified out of {total}",
-                "changes_json": {
-                    "total_processed": total,
-                    "total_changed": changed,
-                    "model": config.OPENAI_MODEL,
-                    "output_file": output_path
-                },
-                "paragraphs_affected": changed,
-            }).execute()
-            print("[OK] Edit session logged to database")
-        except Exception as e:
-            print(f"[WARN] Could not log to database: {e}")
+        log_history(history_record(
+            file_path,
+            "ai_edited",
+            description=f"AI editing: {changed} blocks modified out of {total}",
+            changes_json={
+                "total_processed": total,
+                "total_changed": changed,
+                "model": config.OPENAI_MODEL,
+                "output_file": output_path
+            },
+            paragraphs_affected=changed,
+        ))
 
     return True
 
 
-def process_document(file_path: str):
-    print("\n" + "="*50)
-    print("DOCUMENT PROCESSING")
-    print("="*50 + "\n")
+def get_document_stats(file_path: str):
+    from document_processor import TafsirDocumentProcessor
 
     processor = TafsirDocumentProcessor()
+    if not processor.load_streaming(file_path):
+        return None
 
-    if not processor.load(file_path):
-        return False
+    print("\nClassifying blocks...")
+    return processor.get_stream_stats()
 
-    processor.classify_document()
-    processor.print_classification(limit=20)
 
-    try:
-        client = get_supabase_client()
-        stats = processor.get_stats()
+def process_document(file_path: str, quiet: bool = False):
+    print_header("DOCUMENT PROCESSING")
 
-        client.table("document_history").insert({
-            "document_name": Path(file_path).name,
-            "document_path": str(file_path),
-            "action": "classified",
-            "description": f"Smart classification: {stats.ayah_blocks} ayahs, {stats.commentary_blocks} commentary blocks",
-            "changes_json": {
-                "total_blocks": stats.total_blocks,
-                "ayah_blocks": stats.ayah_blocks,
-                "translation_blocks": stats.translation_blocks,
-                "commentary_blocks": stats.commentary_blocks,
-                "ai_processable_blocks": stats.ai_processable_blocks,
-                "ai_processable_words": stats.ai_processable_words
-            },
-            "paragraphs_affected": stats.total_blocks,
-            "characters_changed": stats.total_characters
-        }).execute()
+    if quiet:
+        # Nothing is listed, so the blocks never need to be kept in memory.
+        stats = get_document_stats(file_path)
+        if stats is None:
+            return False
+    else:
+        processor = get_classified_processor(file_path)
+        if processor is None:
+            return False
 
-        print("[OK] Classification logged to database")
-    except Exception as e:
-        print(f"[WARN] Could not log to database: {e}")
+        processor.print_classification(limit=20)
+        stats = processor.get_stats()
+
+    log_history(history_record(
+        file_path,
+        "classified",
+        description=f"Smart classification: {stats.ayah_blocks} ayahs, {stats.commentary_blocks} commentary blocks",
+        changes_json=asdict(stats),
+        paragraphs_affected=stats.total_blocks,
+        characters_changed=stats.total_characters
+    ))
 
     return True
 
 
 def run_demo():
-    print("\n" + "="*50)
-    print("RUNNING DEMO")
-    print("="*50 + "\n")
+    from document_processor import create_sample_document
+
+    print_header("RUNNING DEMO")
 
     print("Creating sample Tafsir document...")
-    sample_path = create_sample_document()
+    sample_path = create_sample_document(overwrite=False)
     classify_document(sample_path)
 
 
-def main():
+def existing_file(value: str) -> str:
+    if not os.path.isfile(value):
+        raise argparse.ArgumentTypeError(f"File not found: {value}")
+    return value
+
+
+def expand_document_glob(pattern: str) -> List[str]:
+    # Only source documents: skip --edit outputs and Word's ~$ lock files.
+    return sorted(
+        path for path in glob.glob(pattern, recursive=True)
+        if path.lower().endswith(".docx")
+        and not Path(path).stem.endswith("_edited")
+        and not Path(path).name.startswith("~$")
+        and os.path.isfile(path)
+    )
+
+
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Tafsir Editor - Smart Document Parser with AI Editing"
     )
     parser.add_argument(
         "--classify",
         metavar="FILE",
+        type=existing_file,
         help="Classify document blocks (check AYAH vs COMMENTARY detection)"
     )
     parser.add_argument(
         "--edit",
         metavar="FILE",
-        help="AI edit document with visual diff (creates _edited copy)"
+        type=existing_file,
+        nargs="+",
+        help="AI edit document(s) with visual diff (creates _edited copies)"
     )
     parser.add_argument(
         "--dry-run",
@@ -264,13 +395,30 @@ def main():
     parser.add_argument(
         "--process",
         metavar="FILE",
-        help="Process document and log to database"
+        type=existing_file,
+        nargs="+",
+        help="Process document(s) and log to database"
+    )
+    parser.add_argument(
+        "--process-batch",
+        metavar="GLOB",
+        help="Process every .docx matching GLOB (skips _edited copies); history is logged in bulk"
+    )
+    parser.add_argument(
+        "--quiet", "-q",
+        action="store_true",
+        help="Skip the per-block listing (use with --classify or --process)"
     )
     parser.add_argument(
         "--test-connection",
         action="store_true",
         help="Test database connections"
     )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop at the first failed connection (use with --test-connection)"
+    )
     parser.add_argument(
         "--setup-db",
         action="store_true",
@@ -281,6 +429,11 @@ def main():
         action="store_true",
         help="Drop all tables (WARNING: deletes data!)"
     )
+    parser.add_argument(
+        "--yes",
+        action="store_true",
+        help="Skip the confirmation prompt (use with --drop-db)"
+    )
     parser.add_argument(
         "--demo",
         action="store_true",
@@ -296,53 +449,59 @@ def main():
         action="store_true",
         help="Clear existing cache before processing (use with --edit)"
     )
+    return parser
 
-    args = parser.parse_args()
 
-    print_banner()
+_PARSER = _build_parser()
 
-    if args.test_connection:
-        success = test_all_connections()
-        sys.exit(0 if success else 1)
 
-    if args.setup_db:
-        if not config.validate():
-            sys.exit(1)
-        success = setup_database()
-        sys.exit(0 if success else 1)
+def main():
+    args = _PARSER.parse_args()
 
-    if args.drop_db:
-        if not config.validate():
-            sys.exit(1)
-        success = drop_database()
-        sys.exit(0 if success else 1)
+    print_banner()
 
-    if args.classify:
-        if not Path(args.classify).exists():
-            print(f"File not found: {args.classify}")
+    db_commands = {
+        "test_connection": lambda: test_all_connections(fail_fast=args.fail_fast),
+        "setup_db": setup_database,
+        "drop_db": lambda: drop_database(assume_yes=args.yes),
+    }
+    for option, handler in db_commands.items():
+        if getattr(args, option):
+            success = handler()
+            sys.exit(0 if success else 1)
+
+    if args.process_batch:
+        batch_paths = expand_document_glob(args.process_batch)
+        if not batch_paths:
+            print(f"No .docx documents match: {args.process_batch}")
             sys.exit(1)
-        classify_document(args.classify)
-        return
+        args.process = (args.process or []) + batch_paths
 
-    if args.edit:
-        if not Path(args.edit).exists():
-            print(f"File not found: {args.edit}")
-            sys.exit(1)
-        edit_document_with_ai(
-            args.edit,
+    file_commands = {
+        "classify": lambda path: classify_document(path, quiet=args.quiet),
+        "edit": lambda path: edit_document_with_ai(
+            path,
             dry_run=args.dry_run,
             max_blocks=args.max_blocks,
             use_cache=not args.no_cache,
             clear_cache=args.clear_cache
-        )
-        return
-
-    if args.process:
-        if not Path(args.process).exists():
-            print(f"File not found: {args.process}")
-            sys.exit(1)
-        process_document(args.process)
-        return
+        ),
+        "process": lambda path: process_document(path, quiet=args.quiet),
+    }
+    for option, handler in file_commands.items():
+        file_paths = getattr(args, option)
+        if file_paths:
+            if isinstance(file_paths, str):
+                file_paths = [file_paths]
+            file_paths = list(dict.fromkeys(file_paths))
+            # Rows already queued for finished files are still written if a
+            # later file fails or the run is interrupted.
+            try:
+                for file_path in file_paths:
+                    handler(file_path)
+            finally:
+                flush_history()
+            return
 
     if args.demo:
         run_demo()
@@ -369,29 +528,8 @@ def main():
     print("\nStep 4/4: Running demo with smart classification...")
     run_demo()
 
-    print("\n" + "="*70)
-    print("SETUP COMPLETE!")
-    print("="*70)
-    print("""
-Your Tafsir Editor is ready!
-
-Block Types:
-  [AYAH]       - Quranic verses (PROTECTED from AI)
-  [TRANSLATE]  - Russian translations (can process with AI)
-  [COMMENTARY] - Tafsir text (can process with AI)
-
-Commands:
-  python main.py --classify FILE       # Check block classification
-  python main.py --edit FILE           # AI edit with visual diff
-  python main.py --edit FILE --dry-run # Preview changes only
-  python main.py --process FILE        # Log to database
-
-AI Editing:
-  1. Add OPENAI_API_KEY to .env
-  2. Run: python main.py --edit documents/your_file.docx
-  3. Open the _edited.docx file to review changes
-  4. Changes shown as: [strikethrough old] -> [highlighted new]
-""")
+    print_header("SETUP COMPLETE!", width=70, blank_line=False)
+    sys.stdout.write(SETUP_COMPLETE_TEXT)
 
 
 if __name__ == "__main__":